@@ -20,8 +20,7 @@ setup(  name='timspy',
         install_requires=['numpy',
                           'pandas',
                           'scipy',
-                          'timsdata',
-                          'rmodel'],
+                          'timsdata'],
         extras_require={
             'plots': ('matplotlib >= 3.0.0'),
         },
@@ -53,3 +53,21 @@ def which_min_geq(x, y):
 
 def which_max_leq(x,y):
     return np.searchsorted(x, y, side='right')-1
+
+
+def horner(x, coefs):
+    """Evaluate a polynomial with Horner's rule.
+
+    Args:
+        x (iterable): points where to evaluate the polynomial.
+        coefs (np.array): coefficients, highest degree first, as returned by np.polyfit.
+
+    Returns:
+        np.array: values of the polynomial.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.full_like(x, coefs[0])
+    for c in coefs[1:]:
+        y *= x
+        y += c
+    return y
@@ -0,0 +1,58 @@
+import numpy as np
+
+from .array_ops import horner
+
+
+class Polyfit1D(object):
+    """A polynomial fitted to data on a normalized domain.
+
+    The argument is mapped onto [-1, 1] before fitting, which keeps the least squares problem well conditioned for large inputs, like mass indices.
+    """
+    def __init__(self, x, y, deg):
+        """Fit the polynomial.
+
+        Args:
+            x (iterable): control variable.
+            y (iterable): response variable.
+            deg (int): degree of the polynomial.
+        """
+        self.x = np.asarray(x, dtype=np.float64)
+        self.y = np.asarray(y, dtype=np.float64)
+        self.deg = deg
+        x_min, x_max = self.x.min(), self.x.max()
+        self.x_offset = (x_max + x_min) / 2.0
+        self.x_scale = (x_max - x_min) / 2.0 if x_max > x_min else 1.0
+        self.coefs = np.polynomial.polynomial.polyfit(self._normalize(self.x), self.y, deg)[::-1]
+
+    def _normalize(self, x):
+        return (np.asarray(x, dtype=np.float64) - self.x_offset) / self.x_scale
+
+    def __call__(self, x):
+        """Evaluate the polynomial.
+
+        Args:
+            x (iterable): points where to evaluate the polynomial.
+
+        Returns:
+            np.array: predicted values.
+        """
+        return horner(self._normalize(x), self.coefs)
+
+    def __repr__(self):
+        return f"Polyfit1D(deg={self.deg})"
+
+    def plot(self, show=True, **kwds):
+        """Plot the data and the fitted polynomial.
+
+        You need to have matplotlib installed for this method to work.
+
+        Args:
+            show (bool): show the plot.
+            **kwds: arguments for 'matplotlib.pyplot.plot' of the fitted curve.
+        """
+        import matplotlib.pyplot as plt
+        plt.scatter(self.x, self.y, s=1, c='grey')
+        x = np.linspace(self.x.min(), self.x.max(), 1000)
+        plt.plot(x, self(x), c='red', **kwds)
+        if show:
+            plt.show()
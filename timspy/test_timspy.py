@@ -1,3 +1,22 @@
 """Here be tests."""
+import numpy as np
 
+from timspy.models import Polyfit1D
 
+
+def test_Polyfit1D_recovers_polynomials_on_mass_indices():
+    x = np.linspace(30000, 400000, 1000)
+    for coefs in ([1e-9, 2e-3, 5.0],
+                  [1e-21, -2e-15, 3e-9, 1e-3, 2.0]):
+        y = np.polyval(coefs, x)
+        model = Polyfit1D(x, y, deg=len(coefs)-1)
+        np.testing.assert_allclose(model(x), y, rtol=1e-8)
+
+
+def test_Polyfit1D_constant_x_and_scalar_input():
+    model = Polyfit1D(np.full(10, 7.0), np.arange(10.0), deg=0)
+    np.testing.assert_allclose(model([7.0, 100.0]), 4.5)
+    x = np.arange(10.0)
+    model = Polyfit1D(x, 3.0*x + 1.0, deg=1)
+    assert np.ndim(model(2.0)) == 0
+    np.testing.assert_allclose(model(2.0), 7.0)
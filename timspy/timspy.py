@@ -10,13 +10,22 @@ from pathlib import Path
 from timsdata import TimsData
 from timsdata.slice_ops import parse_idx
 from timsdata.iterators import ComfyIter
-from rmodel.polyfit import polyfit
 
 from .array_ops import which_min_geq, which_max_leq
 from .iterators import ranges
+from .models import Polyfit1D
 from .sql import table2df
 
 
+# column types of the data: frames number can exceed 2**16 in long acquisitions, scans do not.
+_column_types = {'frame': np.uint32, 'scan': np.uint16, 'tof': np.uint32, 'i': np.uint32}
+
+
+def _frame_df(frame):
+    """Make a data frame with typed columns out of an array with columns frame, scan, tof, and i."""
+    return pd.DataFrame({name: frame[:,j].astype(tp, copy=False)
+                         for j, (name, tp) in enumerate(_column_types.items())})
+
 
 
 class TimsPyDF(TimsData):
@@ -32,6 +41,7 @@ class TimsPyDF(TimsData):
         self.iter = ComfyIter(self.iter_data_frames)# this should be done as quickly as possible, as it overwrittes the super 'method'.
         self.physIter = ComfyIter(self.iter_physical)
         self.phys = ComfyIter(self.physical)
+        self._tables = {}
         self.frames = self.table2df('Frames').rename(columns={'Time':'rt',
                                                     'Id':'frame'}).sort_values('frame').set_index('frame')
         self.min_frame = self.frames.index.min()
@@ -44,12 +54,17 @@ class TimsPyDF(TimsData):
         self.max_scan = max_scan[0]
         self.max_non_empty_scan = self.frames.index[self.frames.MaxIntensity > 0][-1]
         self.border_scans = self.min_scan, self.max_scan
-        self.min_rt = self.frames.rt.min()
-        self.max_rt = self.frames.rt.max()
+        self._rt = self.frames.rt.to_numpy()
+        self.min_rt = self._rt.min()
+        self.max_rt = self._rt.max()
         self.fit_frame2rt_model()
         self.fit_scan2im_model()
         self.fit_tof2mz_model()
         self.max_im, self.min_im = self.scan2im((self.min_scan, self.max_scan))
+        self._ms_groups = {msms_type: frames.to_numpy()
+                           for msms_type, frames in self.frames.groupby('MsMsType', sort=False).groups.items()}
+        self._frame_tic = None
+        self._peak_counts = None
 
 
     @property
@@ -61,8 +76,10 @@ class TimsPyDF(TimsData):
         minIdx, maxIdx = self.mzToIndex(1, [min_mz, max_mz]).astype(int)
         massIndices = np.linspace(minIdx, maxIdx, mass_indices_cnt).astype(int)
         frames      = np.linspace(self.min_frame, self.max_frame, frames_no).astype(int)
-        indexToMz   = np.vectorize(self.indexToMz, signature='(),(i)->(i)')
-        return indexToMz(frames, massIndices)
+        MZ = np.empty((frames_no, mass_indices_cnt), dtype=np.float64)
+        for i, f in enumerate(frames):
+            MZ[i] = self.indexToMz(int(f), massIndices)
+        return MZ
 
 
     def _estimate_T1_impact(self, min_mz=100, max_mz=4000, mass_indices_cnt=1000, frames_no=40):
@@ -75,7 +92,8 @@ class TimsPyDF(TimsData):
         For each mass index, we estimate the relationship on a grid of frame numbers.
         """
         logMZ = np.log(self._get_mz_frames(min_mz, max_mz, mass_indices_cnt, frames_no))
-        T1 = self.frames.T1.loc[frames].values
+        frames = np.linspace(self.min_frame, self.max_frame, frames_no).astype(int)
+        T1 = self.frames.T1.to_numpy()[frames - self.min_frame]
         lognorm_T1 = np.log(T1) - np.log(T1[0])
         return lognorm_T1.dot( np.subtract(logMZ, logMZ[0,:]) )
 
@@ -90,8 +108,9 @@ class TimsPyDF(TimsData):
         """Find the maximal difference between im for diffent scans for different frames."""
         frames = np.linspace(self.min_frame, self.max_frame, frames_no).astype(int)
         scans = np.linspace(self.min_scan, self.max_scan, frames_no).astype(int)
-        scan2im = np.vectorize(self.scanNumToOneOverK0, signature='(),(i)->(i)')
-        IM = scan2im(frames, scans)
+        IM = np.empty((frames_no, frames_no), dtype=np.float64)
+        for i, f in enumerate(frames):
+            IM[i] = self.scanNumToOneOverK0(int(f), scans)
         return np.abs(IM - IM[0,:]).max()        
 
 
@@ -104,26 +123,22 @@ class TimsPyDF(TimsData):
         return len(self.frames)
 
 
-    @lru_cache(maxsize=1)
     def MS1_frameNumbers(self):
         """Get the numbers of frames in MS1.
         
         Returns:
             np.array: numbers of frames in MS1.
         """
-        F = self.frames
-        return F.index.get_level_values('frame')[F.MsMsType == 0].unique().values
+        return self._ms_groups.get(0, np.array([], dtype=int))
 
 
-    @lru_cache(maxsize=1)
     def MS2_frameNumbers(self):
         """Get the numbers of frames in MS2.
         
         Returns:
             np.array: numbers of frames in MS2.
         """
-        F = self.frames
-        return F.index.get_level_values('frame')[F.MsMsType == 9].unique().values
+        return self._ms_groups.get(9, np.array([], dtype=int))
 
 
     def frame2rt(self, frames):
@@ -132,8 +147,10 @@ class TimsPyDF(TimsData):
         Args:
             frames (int,list): frame numbers to translate.
         """
-        frames = np.r_[frames]
-        return self.frames.rt[frames].values
+        frames = np.atleast_1d(frames)
+        if ((frames < self.min_frame) | (frames > self.max_frame)).any():
+            raise IndexError("frames out of range of the experiment.")
+        return self._rt[frames - self.min_frame]
 
     #TODO: check it!
     def rt2frame(self, rts):
@@ -142,9 +159,10 @@ class TimsPyDF(TimsData):
         Args:
             frames (int,list): frame numbers to translate.
         """
-        rts = np.r_[rts]
-        assert np.logical_and(0 <= rts, rts <= self.frames.rt.max()).all(), "retention times out of range of the experiment."
-        return np.searchsorted(self.frames.rt, rts)+1
+        rts = np.atleast_1d(rts)
+        if not ((rts >= 0) & (rts <= self.max_rt)).all():
+            raise ValueError("retention times out of range of the experiment.")
+        return np.searchsorted(self._rt, rts)+1
 
 
     def rt2supFrame(self, rts):
@@ -159,7 +177,7 @@ class TimsPyDF(TimsData):
         Returns:
             np.array: Frame numbers.
         """
-        return self.frames.index[ which_min_geq(self.frames.rt.values, np.r_[rts]) ].values
+        return self.frames.index[ which_min_geq(self._rt, np.r_[rts]) ].values
 
 
     def rt2infFrame(self, rts):
@@ -173,7 +191,7 @@ class TimsPyDF(TimsData):
         Returns:
             np.array: Frame numbers.
         """
-        return self.frames.index[ which_max_leq(self.frames.rt.values, np.r_[rts]) ].values
+        return self.frames.index[ which_max_leq(self._rt, np.r_[rts]) ].values
 
 
     def __repr__(self, k=3):
@@ -192,16 +210,29 @@ class TimsPyDF(TimsData):
         return r
 
 
-    @lru_cache(maxsize=1)
+    def frame_TICs(self):
+        """Get the Total Ion Current of each frame.
+
+        The values are computed once and then reused.
+
+        Returns:
+            np.array: Total Ion Currents, one per frame from 'min_frame' to 'max_frame'.
+        """
+        if self._frame_tic is None:
+            s,S = self.border_scans
+            f,F = self.border_frames
+            self._frame_tic = np.fromiter((self.frameTIC(frame, s, S, True) for frame in range(f, F+1)),
+                                          dtype=np.int64, count=F-f+1)
+        return self._frame_tic
+
+
     def global_TIC(self):
         """Get the Total Ion Current across the entire experiment.
 
         Returns:
             int: Total Ion Current value.
         """
-        s,S = self.border_scans
-        f,F = self.border_frames
-        return sum(self.frameTIC(f, s, S, True) for f in range(f, F+1))
+        return self.frame_TICs().sum()
 
 
     @lru_cache(maxsize=1)
@@ -229,31 +260,33 @@ class TimsPyDF(TimsData):
         mzIdx_step = (mzIdx_max - mzIdx_min) // 1000
         mzIdx = np.arange(mzIdx_min, mzIdx_max, mzIdx_step)
         mz = self.indexToMz(1, mzIdx)
-        self.tof2mz_model = polyfit(mzIdx, mz, deg=deg)
+        self.tof2mz_model = Polyfit1D(mzIdx, mz, deg=deg)
 
 
     def fit_frame2rt_model(self, deg=5):
         """Fit a model that will change frame numbers to retention time values."""
         # fr = np.arange(self.min_frame, self.max_frame+1)
-        fr = self.frames.index
-        rt = self.frames.rt.values
-        self.frame2rt_model = polyfit(fr, rt, deg=deg)
+        fr = self.frames.index.to_numpy()
+        self.frame2rt_model = Polyfit1D(fr, self._rt, deg=deg)
 
 
     def fit_scan2im_model(self, deg=4):
         scans = np.arange(self.min_scan, self.max_scan+1)
         ims = self.scan2im(scans)
-        self.scan2im_model = polyfit(scans, ims, deg=deg)
+        self.scan2im_model = Polyfit1D(scans, ims, deg=deg)
 
 
-    @lru_cache(maxsize=64)
     def table2df(self, name):
         """Retrieve a table with a given name from the '*.tdf' file.
 
+        Tables are read once and then served from the instance's '_tables'.
+
         Args:
             name (str): The name of the table to retrieve.        
         """
-        return table2df(self.conn, name)
+        if name not in self._tables:
+            self._tables[name] = table2df(self.conn, name)
+        return self._tables[name]
 
 
     def tof2mz(self, tof, frame=1):
@@ -266,6 +299,15 @@ class TimsPyDF(TimsData):
         return self.indexToMz(frame, tof)
 
 
+    def tof2mz_fast(self, tof):
+        """Approximate mass over charge ratios of mass indices with the fitted polynomial.
+
+        Args:
+            tof (int,iterable,np.array,pd.Series): time of flight indices.
+        """
+        return self.tof2mz_model(tof)
+
+
     def mz2tof(self, mz, frame=1):
         """Translate mass over charge ratios to mass indices (flight times).
 
@@ -287,6 +329,15 @@ class TimsPyDF(TimsData):
         return self.scanNumToOneOverK0(frame, scan)
 
 
+    def scan2im_fast(self, scan):
+        """Approximate ion mobilities of scan numbers with the fitted polynomial.
+
+        Args:
+            scan (list,np.array,pd.Series): scans.
+        """
+        return self.scan2im_model(scan)
+
+
     def im2scan(self, im, frame=1):
         """Translate ion mobilities to scan numbers.
 
@@ -310,9 +361,7 @@ class TimsPyDF(TimsData):
         Returns:
             pandas.DataFrame: four-columns data frame.
         """
-        out = pd.DataFrame(self.frame_array(frame, scan_begin, scan_end))
-        out.columns = ('frame', 'scan', 'tof','i')
-        return out
+        return _frame_df(self.frame_array(frame, scan_begin, scan_end))
 
 
     def plot_models(self, horizontal=True, legend=True, show=True):
@@ -350,13 +399,13 @@ class TimsPyDF(TimsData):
         if isinstance(scans, slice):
             s = self.min_scan if scans.start is None else scans.start
             S = self.max_scan if scans.stop is None else scans.stop
-        elif isinstance(scans, int):
+        elif isinstance(scans, (int, np.integer)):
             s = scans
             S = scans+1
         else:
             #TODO: this is the only part that is not filtering anything.
             #In general, it should filter out unwanted scans.
-            scans = np.r_[scans]
+            scans = np.atleast_1d(scans)
             if len(scans) > 0:
                 s = scans.min()
                 S = scans.max()+1
@@ -367,11 +416,11 @@ class TimsPyDF(TimsData):
         return s, S
 
 
-    def iter_data_frames(self, x):
-        """Private iteration over arrays.
+    def _iter_arrays(self, x):
+        """Private iteration over raw arrays with columns frame, scan, tof, and i.
 
-        You can call it explicitly, but better call it like D.iter[1:10, 100:200].
         x is something that can be handled by __getitem__.
+        Empty frames are skipped.
         """
         if not isinstance(x, tuple):
             s, S = self.border_scans
@@ -400,11 +449,19 @@ class TimsPyDF(TimsData):
             if f <= frameNo <= F:
                 frame = self.frame_array(frameNo,s,S)
                 if len(frame):
-                    frame = pd.DataFrame(frame)
-                    frame.columns = ('frame', 'scan', 'tof', 'i') 
                     yield frame
 
 
+    def iter_data_frames(self, x):
+        """Private iteration over data frames.
+
+        You can call it explicitly, but better call it like D.iter[1:10, 100:200].
+        x is something that can be handled by __getitem__.
+        """
+        for frame in self._iter_arrays(x):
+            yield _frame_df(frame)
+
+
     def __getitem__(self, x):
         """Get a data frame for given frames and scans.
 
@@ -412,11 +469,11 @@ class TimsPyDF(TimsData):
             x (tuple): First element corresponds to iterable/slice of frames. Second element corresponds to slice/iterable of scans. For now, only selection by scan_begin:scan_end is supported.
         Returns:
             pd.DataFrame: Data frame with columns with frame numbers, scan numbers, mass indices, and intensities."""
-        dfs = list(self.iter_data_frames(x))
-        if dfs:
-            return pd.concat(dfs)
+        arrays = list(self._iter_arrays(x))
+        if arrays:
+            return _frame_df(np.concatenate(arrays, axis=0))
         else: 
-            return pd.DataFrame(columns=('frame', 'scan', 'tof', 'i'))
+            return _frame_df(np.empty((0, 4), dtype=np.uint32))
 
 
     def iter_MS1(self):
@@ -554,14 +611,30 @@ class TimsPyDF(TimsData):
 
 
     #TODO: this can be done similarly to how VAEX does it.
-    def plot_overview(self, min_frame, max_frame, show=True):
-        """Plot overview."""
+    def plot_overview(self, min_frame, max_frame, models=True, show=True):
+        """Plot overview.
+
+        Args:
+            min_frame (int): Minimal frame in selection.
+            max_frame (int): Maximal frame in selection.
+            models (boolean): Use the fitted polynomials instead of the exact calibration to get m/z and ion mobilities.
+            show (boolean): Show the plot or only append it to the current canvas.
+        """
         import matplotlib.pyplot as plt
 
         df = self[min_frame:max_frame]
-        df['mz'] = self.tof2mz(df.tof)
-        df['im'] = self.scan2im(df.scan)
-        X = df.groupby([round(df.im, 2), round(df.mz)]).i.sum().reset_index()
+        if models:
+            mz = self.tof2mz_fast(df.tof.values)
+            im = self.scan2im_fast(df.scan.values)
+        else:
+            mz = self.tof2mz(df.tof.values)
+            im = self.scan2im(df.scan.values)
+        # integer keys: m/z rounded to units, ion mobility to hundredths.
+        mz = np.round(mz).astype(np.int64)
+        im = np.round(im * 100).astype(np.int64)
+        X = pd.DataFrame({'im': im, 'mz': mz, 'i': df.i.values})
+        X = X.groupby(['im', 'mz'], sort=False).i.sum().reset_index()
+        X['im'] = X.im / 100
         im_res = len(X.im.unique())
         mz_res = len(X.mz.unique())
         plt.hist2d(X.mz, X.im, weights=X.i, bins=(mz_res, im_res), cmap=plt.cm.magma)
@@ -579,28 +652,40 @@ class TimsPyDF(TimsData):
             max_frame (int): Maximal frame in selection for saving.
         """
         import vaex as vx
-        min_frame = self.min_frame if min_frame is None else min_frame
-        max_frame = self.max_frame if max_frame is None else max_frame
+        min_frame = self.min_frame if min_frame is None else max(min_frame, self.min_frame)
+        max_frame = self.max_frame if max_frame is None else min(max_frame, self.max_frame)
         out_folder = Path(out_folder)
         out_folder.mkdir(parents=True, exist_ok=True)
-        types_remap = {'frame':'uint16', 'scan':'uint16', 'tof':'uint32', 'i':'uint32'}
-        #TODO: types should be remaped earlier!
+        peaks_cnt = self.frames.NumPeaks.to_numpy()
         for f, F in ranges(min_frame, max_frame+1, step):
-            pd_df = self[f:F]
-            pd_df = pd_df.astype(types_remap)
+            # NumPeaks bounds the number of rows: fill typed columns directly.
+            N = peaks_cnt[f-self.min_frame:F-self.min_frame].sum()
+            cols = {name: np.empty(N, dtype=tp) for name, tp in _column_types.items()}
+            n = 0
+            for frame in self._iter_arrays(slice(f,F)):
+                m = n + len(frame)
+                for j, col in enumerate(cols.values()):
+                    col[n:m] = frame[:,j]
+                n = m
             path = str(out_folder/f"{f}_{F}.hdf5")
-            vx_df = vx.from_pandas(pd_df, copy_index=False)
-            vx_df.export_hdf5(path=path)
-            del vx_df, pd_df
+            vx_df = vx.from_arrays(**{name: col[:n] for name, col in cols.items()})
+            vx_df.export_hdf5(path=path, progress=False, chunk_size=1000000)
+            del vx_df, cols
 
 
-    @lru_cache(maxsize=1)
     def count_all_peaks(self):
-        """Get the number of peaks detected per each (frame,scan)."""
-        frames = range(self.min_frame, self.max_frame+1)
-        s, S = self.border_scans
-        return pd.DataFrame(np.vstack([self.peakCnts_massIdxs_intensities(f,s,S)[s:S]
-                                       for f in frames]), index=frames)
+        """Get the number of peaks detected per each (frame,scan).
+
+        The counts are computed once and then reused.
+        """
+        if self._peak_counts is None:
+            frames = range(self.min_frame, self.max_frame+1)
+            s, S = self.border_scans
+            counts = np.empty((len(frames), S-s), dtype=np.uint32)
+            for i, f in enumerate(frames):
+                counts[i] = self.peakCnts_massIdxs_intensities(f,s,S)[s:S]
+            self._peak_counts = pd.DataFrame(counts, index=frames)
+        return self._peak_counts
 
 
     def plot_peak_counts(self, binary=False, show=True):
@@ -616,11 +701,11 @@ class TimsPyDF(TimsData):
         if binary:
             plt.axhline(y=self.max_scan, color='r', linestyle='-')
             plt.axhline(y=self.min_scan, color='r', linestyle='-')
-        SSU = np.count_nonzero(SU, axis=1) if binary else SU.sum(axis=1)
-        SSU_MS1 = SSU.copy()
-        SSU_MS1[self.MS2_frameNumbers()] = 0
-        SSU_MS2 = SSU.copy()
-        SSU_MS2[self.MS1_frameNumbers()] = 0
+        SSU = np.count_nonzero(SU, axis=1) if binary else SU.sum(axis=1).to_numpy()
+        is_ms1 = np.zeros(len(SSU), dtype=bool)
+        is_ms1[self.MS1_frameNumbers() - self.min_frame] = True
+        SSU_MS1 = np.where(is_ms1, SSU, 0)
+        SSU_MS2 = np.where(is_ms1, 0, SSU)
         f = range(self.min_frame, self.max_frame+1)
         plt.vlines(f,0, SSU_MS1, colors='orange')
         plt.plot(f, SSU_MS2, c='grey')
@@ -663,19 +748,23 @@ class TimsDIA(TimsPyDF):
                             'scan_max':  self.max_scan,
                             'mz_left' :  0,
                             'mz_right':  inf}, index=[0])
-        W = MS1.append(W)
-        W['win'] = W['window'] = range(len(W))
+        W = pd.concat([MS1, W], axis=0)
+        W['win'] = W['window'] = np.arange(len(W))
         windows_per_group = W.groupby('group').window.count().unique().max()
         W['stripe'] = np.where(W['window'] != 0, (W['win']-1).mod(windows_per_group) + 1, 0)
         W = W.set_index(['window', 'group'])
         W.index.names = 'window', 'window_gr'
-        self.grid = sorted(list( set(W.mz_left) | set(W.mz_right) ))
-        W['left'] = np.searchsorted(self.grid, W.mz_left)
-        W['right'] = np.searchsorted(self.grid, W.mz_right)+1
-        W['prev_left']  = [ W.left[-1]  ]*2 + list(W.left[1:-1])
-        W['prev_right'] = [ W.right[-1] ]*2 + list(W.right[1:-1])
-        IM_windows = W[['scan_min','scan_max']].apply(lambda x: self.scanNumToOneOverK0(1,x))
-        IM_windows.columns = 'IM_min', 'IM_max'
+        mz_left, mz_right = W.mz_left.to_numpy(), W.mz_right.to_numpy()
+        self.grid = np.unique(np.concatenate([mz_left, mz_right]))
+        W['left'] = np.searchsorted(self.grid, mz_left)
+        W['right'] = np.searchsorted(self.grid, mz_right)+1
+        left, right = W.left.to_numpy(), W.right.to_numpy()
+        W['prev_left']  = np.r_[left[-1],  left[-1],  left[1:-1]]
+        W['prev_right'] = np.r_[right[-1], right[-1], right[1:-1]]
+        IM_windows = self.scanNumToOneOverK0(1, W[['scan_min','scan_max']].to_numpy().ravel())
+        IM_windows = pd.DataFrame(IM_windows.reshape(-1,2),
+                                  columns=('IM_min', 'IM_max'),
+                                  index=W.index)
         W = pd.concat([W, IM_windows], axis=1)
         stripes_no = (len(W)-1) // W.index.get_level_values('window_gr')[-1]
         w = np.mod(W.index.get_level_values('window').values - 1, stripes_no)
@@ -734,16 +823,20 @@ class TimsDIA(TimsPyDF):
     #         F = self.frames.loc[(frames, window_grs),:]
     #         if filter_frames:
     #             F = F.query(filter_frames)
-    #         F = F.index.to_frame(index=False)
+    #         F = F.reset_index()[['frame', 'window_gr', 'NumPeaks']]
     #         if windows != slice(None):
     #             W = self.windows.loc[(windows, window_grs),['scan_min', 'scan_max']]
     #             F = F.merge(W, on='window_gr')
-    #             F = F.drop(columns='window_gr')
-    #             arrays = [self.frame_array(f,s,S) for _,f,s,S in F.itertuples()]
     #         else:
-    #             s, S = self.border_scans
-    #             arrays = [self.frame_array(f,s,S) for _,f,_ in F.itertuples()]
-    #         return np.concatenate(arrays, axis=0)
+    #             F['scan_min'], F['scan_max'] = self.border_scans
+    #         # windows of one group do not overlap in scans, so NumPeaks bounds the output size.
+    #         out = np.empty((F.NumPeaks.sum(), 4), dtype=np.uint32)
+    #         n = 0
+    #         for f, s, S in zip(F.frame.values, F.scan_min.values, F.scan_max.values):
+    #             frame = self.frame_array(f,s,S)
+    #             out[n:n+len(frame)] = frame
+    #             n += len(frame)
+    #         return out[:n]
 
 
     def mzRange2windows(self, min_mz, max_mz):